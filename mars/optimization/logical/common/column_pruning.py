@@ -33,7 +33,7 @@ class PruneDataSource(OperandBasedOptimizationRule, metaclass=ABCMeta):
                 rule_type
                 for rule_type in self._rule_type_to_op_types
                 if issubclass(rule_type, PruneDataSource)
-                and isinstance(succ.op, tuple(self._rule_type_to_op_types[rule_type]))
+                and isinstance(succ.op, rule_type._get_op_types_tuple())
             ]
             if not prune_rule_types:
                 return False
@@ -41,7 +41,7 @@ class HeadPushDown(OperandBasedOptimizationRule):
                 rule_type
                 for rule_type in self._rule_type_to_op_types
                 if issubclass(rule_type, HeadPushDown)
-                and isinstance(succ.op, tuple(self._rule_type_to_op_types[rule_type]))
+                and isinstance(succ.op, rule_type._get_op_types_tuple())
             ]
             if not push_down_rule_types:
                 return False
@@ -11,13 +11,12 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import functools
 import weakref
 from abc import ABC, abstractmethod
 from collections import defaultdict
 from dataclasses import dataclass
 from enum import Enum
-from typing import Dict, List, Optional, Type, Set
+from typing import Dict, List, Optional, Tuple, Type, Set
 
 from ...core import OperandType, EntityType, enter_mode
 from ...core.graph import EntityGraph
@@ -40,53 +39,126 @@ class OptimizationRecord:
 class OptimizationRecords:
     _records: List[OptimizationRecord]
     _original_entity_to_records: Dict[EntityType, OptimizationRecord]
+    _optimized_entity_to_records: Dict[EntityType, OptimizationRecord]
+    # memoized chain terminals, with reverse indices of cached entities
+    # per terminal to invalidate stale entries once a chain gets extended
+    _terminal_cache: Dict[EntityType, Optional[EntityType]]
+    _terminal_to_cached: Dict[EntityType, Set[EntityType]]
+    _original_terminal_cache: Dict[EntityType, Optional[EntityType]]
+    _original_terminal_to_cached: Dict[EntityType, Set[EntityType]]
 
     def __init__(self):
         self._records = list()
         self._original_entity_to_records = dict()
         self._optimized_entity_to_records = dict()
+        self._terminal_cache = dict()
+        self._terminal_to_cached = dict()
+        self._original_terminal_cache = dict()
+        self._original_terminal_to_cached = dict()
+
+    @staticmethod
+    def _invalidate_cache(
+        terminal: Optional[EntityType],
+        cache: Dict[EntityType, Optional[EntityType]],
+        terminal_to_cached: Dict[EntityType, Set[EntityType]],
+    ):
+        for cached in terminal_to_cached.pop(terminal, ()):
+            cache.pop(cached, None)
+
+    @staticmethod
+    def _compress_path(
+        chain: List[EntityType],
+        terminal: Optional[EntityType],
+        cache: Dict[EntityType, Optional[EntityType]],
+        terminal_to_cached: Dict[EntityType, Set[EntityType]],
+    ):
+        terminal_to_cached.setdefault(terminal, set()).update(chain)
+        for entity in chain:
+            cache[entity] = terminal
 
     def append_record(self, record: OptimizationRecord):
+        # all cached chains going through the entity of the new record
+        # end at its current terminal, which is itself if not recorded yet,
+        # thus only entries of that terminal need to be invalidated
         self._records.append(record)
         if record.record_type in (
             OptimizationRecordType.replace,
             OptimizationRecordType.delete,
         ):
-            self._original_entity_to_records[record.original_entity] = record
+            entity = record.original_entity
+            self._invalidate_cache(
+                self.get_optimization_result(entity, entity),
+                self._terminal_cache,
+                self._terminal_to_cached,
+            )
+            self._original_entity_to_records[entity] = record
         if record.record_type in (
             OptimizationRecordType.new,
             OptimizationRecordType.replace,
         ):
-            self._optimized_entity_to_records[record.new_entity] = record
+            entity = record.new_entity
+            self._invalidate_cache(
+                self.get_original_entity(entity, entity),
+                self._original_terminal_cache,
+                self._original_terminal_to_cached,
+            )
+            self._optimized_entity_to_records[entity] = record
 
     def get_optimization_result(
         self, original_entity: EntityType, default: Optional[EntityType] = None
     ) -> EntityType:
-        entity = original_entity
-        if entity not in self._original_entity_to_records:
+        record = self._original_entity_to_records.get(original_entity)
+        if record is None:
             return default
-        while entity in self._original_entity_to_records:
-            record = self._original_entity_to_records[entity]
+        try:
+            return self._terminal_cache[original_entity]
+        except KeyError:
+            pass
+
+        chain = []
+        entity = original_entity
+        while record is not None:
+            chain.append(entity)
             if record.record_type == OptimizationRecordType.replace:
                 entity = record.new_entity
+                record = self._original_entity_to_records.get(entity)
             else:
                 assert record.record_type == OptimizationRecordType.delete
-                return None
+                entity = None
+                break
+        self._compress_path(
+            chain, entity, self._terminal_cache, self._terminal_to_cached
+        )
         return entity
 
     def get_original_entity(
         self, optimized_entity: EntityType, default: Optional[EntityType] = None
     ) -> EntityType:
-        entity = optimized_entity
-        if entity not in self._optimized_entity_to_records:
+        record = self._optimized_entity_to_records.get(optimized_entity)
+        if record is None:
             return default
-        while entity in self._optimized_entity_to_records:
-            record = self._optimized_entity_to_records[entity]
+        try:
+            return self._original_terminal_cache[optimized_entity]
+        except KeyError:
+            pass
+
+        chain = []
+        entity = optimized_entity
+        while record is not None:
+            chain.append(entity)
             if record.record_type == OptimizationRecordType.replace:
                 entity = record.original_entity
+                record = self._optimized_entity_to_records.get(entity)
             else:
                 assert record.record_type == OptimizationRecordType.new
-                return None
+                entity = None
+                break
+        self._compress_path(
+            chain,
+            entity,
+            self._original_terminal_cache,
+            self._original_terminal_to_cached,
+        )
         return entity
 
 
@@ -102,11 +174,16 @@ class OptimizationRule(ABC):
         self._graph = graph
         self._records = records
         self._optimizer_cls = optimizer_cls
-        self._cached_rule = functools.lru_cache(maxsize=None)(
-            lambda _rule_type: _rule_type(
+        self._rule_cache = dict()
+
+    def _cached_rule(self, rule_type: Type["OptimizationRule"]) -> "OptimizationRule":
+        try:
+            return self._rule_cache[rule_type]
+        except KeyError:
+            rule = self._rule_cache[rule_type] = rule_type(
                 self._graph, self._records, self._optimizer_cls
             )
-        )
+            return rule
 
     @abstractmethod
     def apply(self) -> bool:
@@ -132,30 +209,37 @@ class OptimizationRule(ABC):
 
     def _add_collapsable_predecessor(self, node: EntityType, predecessor: EntityType):
         pred_original = self._records.get_original_entity(predecessor, predecessor)
-        if predecessor not in self._preds_to_remove:
-            self._preds_to_remove[pred_original] = {node}
-        else:
-            self._preds_to_remove[pred_original].add(node)
+        self._preds_to_remove.setdefault(pred_original, set()).add(node)
 
     def _remove_collapsable_predecessors(self, node: EntityType):
-        node = self._records.get_optimization_result(node) or node
-        preds_opt_to_remove = []
-        for pred in self._graph.predecessors(node):
-            pred_original = self._records.get_original_entity(pred, pred)
-            pred_opt = self._records.get_optimization_result(pred, pred)
+        graph = self._graph
+        records = self._records
+        preds_to_remove = self._preds_to_remove
+        get_optimization_result = records.get_optimization_result
+        get_original_entity = records.get_original_entity
 
-            if pred_opt in self._graph.results or pred_original in self._graph.results:
+        node = get_optimization_result(node) or node
+        preds_opt_to_remove = []
+        results_set = set(graph.results)
+        for pred in graph.predecessors(node):
+            pred_original = get_original_entity(pred, pred)
+            pred_opt = get_optimization_result(pred, pred)
+
+            if pred_opt in results_set or (
+                pred_original is not pred_opt and pred_original in results_set
+            ):
                 continue
-            affect_succ = self._preds_to_remove.get(pred_original) or []
-            affect_succ_opt = [
-                self._records.get_optimization_result(s, s) for s in affect_succ
-            ]
-            if all(s in affect_succ_opt for s in self._graph.successors(pred)):
+            affect_succ = preds_to_remove.get(pred_original) or []
+            affect_succ_opt = {get_optimization_result(s, s) for s in affect_succ}
+            for succ in graph.iter_successors(pred):
+                if succ not in affect_succ_opt:
+                    break
+            else:
                 preds_opt_to_remove.append((pred_original, pred_opt))
 
         for pred_original, pred_opt in preds_opt_to_remove:
-            self._graph.remove_node(pred_opt)
-            self._records.append_record(
+            graph.remove_node(pred_opt)
+            records.append_record(
                 OptimizationRecord(pred_original, None, OptimizationRecordType.delete)
             )
 
@@ -168,12 +252,50 @@ class OperandBasedOptimizationRule(OptimizationRule):
     _rule_type_to_op_types: Dict[
         Type[OptimizationRule], Set[Type[OperandType]]
     ] = defaultdict(set)
+    _rule_type_to_op_types_tuple: Dict[
+        Type[OptimizationRule], Tuple[Type[OperandType], ...]
+    ] = dict()
+
+    @classmethod
+    def _get_op_types_tuple(cls) -> Tuple[Type[OperandType], ...]:
+        try:
+            return cls._rule_type_to_op_types_tuple[cls]
+        except KeyError:
+            # deeper subclasses first to hit isinstance checks earlier
+            op_types = tuple(
+                sorted(
+                    cls._rule_type_to_op_types[cls],
+                    key=lambda t: len(t.__mro__),
+                    reverse=True,
+                )
+            )
+            cls._rule_type_to_op_types_tuple[cls] = op_types
+            return op_types
+
+    def __init__(
+        self,
+        graph: EntityGraph,
+        records: OptimizationRecords,
+        optimizer_cls: Type["Optimizer"],
+    ):
+        super().__init__(graph, records, optimizer_cls)
+        # rules are created once per optimization, thus operand types
+        # can be resolved for the concrete rule type in advance
+        self._op_types = self._get_op_types_tuple()
 
     @implements(OptimizationRule.apply)
     def apply(self) -> bool:
         visited = set()
         optimized = False
-        for entity in list(self._graph.topological_iter()):
+        op_types = self._op_types
+        # graph may be modified during optimization, thus candidates
+        # are collected before applying the rule
+        candidates = [
+            entity
+            for entity in self._graph.topological_iter()
+            if isinstance(entity.op, op_types)
+        ]
+        for entity in candidates:
             op = entity.op
             if op in visited:
                 continue
@@ -182,8 +304,7 @@ class OperandBasedOptimizationRule(OptimizationRule):
             if entity not in self._graph:  # pragma: no cover
                 # maybe removed during optimization
                 continue
-            op_types = self._rule_type_to_op_types[type(self)]
-            if isinstance(op, tuple(op_types)) and self.match_operand(op):
+            if self.match_operand(op):
                 optimized = True
                 self.apply_to_operand(op)
 
@@ -220,6 +341,7 @@ class OperandBasedOptimizationRule(OptimizationRule):
 
     @classmethod
     def register_operand(cls, op_type: Type[OperandType]):
+        cls._rule_type_to_op_types_tuple.pop(cls, None)
         cls._rule_type_to_op_types[cls].add(op_type)
         for derived in op_type.__subclasses__():
             cls._rule_type_to_op_types[cls].add(derived)
@@ -236,19 +358,27 @@ class Optimizer(ABC):
 
     @classmethod
     def _replace_inputs(cls, graph: EntityGraph, records: OptimizationRecords):
+        # outputs of the same operand share inputs,
+        # thus every operand is visited only once
+        ops = dict()
         for node in graph:
-            for succ in graph.successors(node):
-                input_optimized = False
-                new_inputs = []
-                for inp in succ.inputs:
+            ops.setdefault(id(node.op), node)
+
+        # resolve every distinct input only once, keyed by id
+        # as inputs are shared by multiple nodes
+        resolved = dict()
+        for node in ops.values():
+            for inp in node.inputs:
+                inp_id = id(inp)
+                if inp_id not in resolved:
                     optimized = records.get_optimization_result(inp)
-                    if optimized is None:
-                        optimized = inp
-                    if optimized is not inp:
-                        input_optimized = True
-                    new_inputs.append(optimized)
-                if input_optimized:
-                    succ.inputs = new_inputs
+                    resolved[inp_id] = inp if optimized is None else optimized
+
+        for node in ops.values():
+            inputs = node.inputs
+            new_inputs = [resolved[id(inp)] for inp in inputs]
+            if any(new is not old for new, old in zip(new_inputs, inputs)):
+                node.inputs = new_inputs
 
     @classmethod
     @enter_mode(build=True)
@@ -267,12 +397,13 @@ class Optimizer(ABC):
             Optimization records.
         """
         records = OptimizationRecords()
-        cached_rule = functools.lru_cache(maxsize=None)(
-            lambda _rule_type: _rule_type(graph, records, cls)
-        )
+        rule_cache = dict()
 
         for rule_type in cls._rule_types:
-            rule = cached_rule(rule_type)
+            try:
+                rule = rule_cache[rule_type]
+            except KeyError:
+                rule = rule_cache[rule_type] = rule_type(graph, records, cls)
             if rule.apply():
                 cls._replace_inputs(graph, records)
                 new_results = []
@@ -0,0 +1,86 @@
+# Copyright 1999-2021 Alibaba Group Holding Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from .... import tensor as mt
+from ....core import TileableGraph, TileableGraphBuilder
+from ..core import (
+    Optimizer,
+    OptimizationRecord,
+    OptimizationRecordType,
+    OptimizationRecords,
+)
+
+
+def test_optimization_records():
+    t1, t2, t3, t4 = [mt.ones((10,)).data for _ in range(4)]
+    t5 = mt.ones((10,)).data
+
+    records = OptimizationRecords()
+    assert records.get_optimization_result(t1) is None
+    assert records.get_optimization_result(t1, t1) is t1
+
+    records.append_record(OptimizationRecord(t1, t2, OptimizationRecordType.replace))
+    assert records.get_optimization_result(t1) is t2
+    assert records.get_original_entity(t2) is t1
+
+    # extending the chain shall invalidate memoized results
+    records.append_record(OptimizationRecord(t2, t3, OptimizationRecordType.replace))
+    assert records.get_optimization_result(t1) is t3
+    assert records.get_optimization_result(t2) is t3
+    assert records.get_original_entity(t3) is t1
+    assert records.get_original_entity(t2) is t1
+
+    # overwriting a record inside the chain
+    records.append_record(OptimizationRecord(t2, t4, OptimizationRecordType.replace))
+    assert records.get_optimization_result(t1) is t4
+    assert records.get_original_entity(t4) is t1
+
+    records.append_record(OptimizationRecord(t4, None, OptimizationRecordType.delete))
+    assert records.get_optimization_result(t1) is None
+    assert records.get_optimization_result(t2) is None
+
+    records.append_record(OptimizationRecord(None, t5, OptimizationRecordType.new))
+    assert records.get_original_entity(t5) is None
+    assert records.get_original_entity(t3) is t1
+
+    # overwriting a record shall keep cached results of unrelated chains
+    t6, t7, t8, t9, t10 = [mt.ones((10,)).data for _ in range(5)]
+    records.append_record(OptimizationRecord(t6, t7, OptimizationRecordType.replace))
+    records.append_record(OptimizationRecord(t8, t9, OptimizationRecordType.replace))
+    assert records.get_optimization_result(t6) is t7
+    assert records.get_optimization_result(t8) is t9
+    records.append_record(OptimizationRecord(t6, t10, OptimizationRecordType.replace))
+    assert t6 not in records._terminal_cache
+    assert records._terminal_cache[t8] is t9
+    assert records.get_optimization_result(t6) is t10
+    assert records.get_optimization_result(t8) is t9
+
+
+def test_replace_inputs():
+    a = mt.random.rand(20, 10, chunk_size=10)
+    q, r = mt.linalg.qr(a)
+    assert q.op is r.op
+
+    graph = TileableGraph([q.data, r.data])
+    next(TileableGraphBuilder(graph).build())
+
+    new_a = mt.random.rand(20, 10, chunk_size=10)
+    records = OptimizationRecords()
+    records.append_record(
+        OptimizationRecord(a.data, new_a.data, OptimizationRecordType.replace)
+    )
+    Optimizer._replace_inputs(graph, records)
+    assert len(q.inputs) == 1
+    assert q.inputs[0] is new_a.data
+    assert r.inputs[0] is new_a.data
@@ -37,31 +37,24 @@ class EvalExtractRecord(NamedTuple):
     variables: Optional[dict] = None
 
 
-def _get_binop_builder(op_str: str):
-    def builder(lhs: str, rhs: str):
-        return f"({lhs}) {op_str} ({rhs})"
-
-    return builder
-
-
-_func_name_to_builder = {
-    "add": _get_binop_builder("+"),
-    "sub": _get_binop_builder("-"),
-    "mul": _get_binop_builder("*"),
-    "floordiv": _get_binop_builder("//"),
-    "truediv": _get_binop_builder("/"),
-    "pow": _get_binop_builder("**"),
-    "eq": _get_binop_builder("=="),
-    "ne": _get_binop_builder("!="),
-    "lt": _get_binop_builder("<"),
-    "le": _get_binop_builder("<="),
-    "gt": _get_binop_builder(">"),
-    "ge": _get_binop_builder(">="),
-    "__and__": _get_binop_builder("&"),
-    "__or__": _get_binop_builder("|"),
-    "__xor__": _get_binop_builder("^"),
-    "negative": lambda expr: f"-({expr})",
-    "__invert__": lambda expr: f"~({expr})",
+_func_name_to_template = {
+    "add": "({}) + ({})",
+    "sub": "({}) - ({})",
+    "mul": "({}) * ({})",
+    "floordiv": "({}) // ({})",
+    "truediv": "({}) / ({})",
+    "pow": "({}) ** ({})",
+    "eq": "({}) == ({})",
+    "ne": "({}) != ({})",
+    "lt": "({}) < ({})",
+    "le": "({}) <= ({})",
+    "gt": "({}) > ({})",
+    "ge": "({}) >= ({})",
+    "__and__": "({}) & ({})",
+    "__or__": "({}) | ({})",
+    "__xor__": "({}) ^ ({})",
+    "negative": "-({})",
+    "__invert__": "~({})",
 }
 _extract_result_cache = weakref.WeakKeyDictionary()
 
@@ -122,46 +115,77 @@ class SeriesArithmeticToEval(OperandBasedOptimizationRule):
         if tileable in _extract_result_cache:
             return _extract_result_cache[tileable]
 
-        if self._is_select_dataframe_column(tileable):
-            result = self._extract_column_select(tileable)
-        elif isinstance(tileable.op, DataFrameUnaryUfunc):
-            result = self._extract_unary(tileable)
-        elif isinstance(tileable.op, DataFrameBinopUfunc):
-            if tileable.op.fill_value is not None or tileable.op.level is not None:
-                result = EvalExtractRecord()
-            else:
-                result = self._extract_binary(tileable)
+        # extract inputs in post order with an explicit stack rather than
+        # recursion, thus long arithmetic chains will not hit recursion limits
+        # and every input is already cached when its successor is extracted
+        stack = [(tileable, False)]
+        while stack:
+            entity, inputs_extracted = stack.pop()
+            if entity in _extract_result_cache:
+                continue
+            if not inputs_extracted:
+                inputs = [
+                    inp
+                    for inp in self._get_extract_inputs(entity)
+                    if isinstance(inp, ENTITY_TYPE)
+                    and inp not in _extract_result_cache
+                ]
+                if inputs:
+                    stack.append((entity, True))
+                    stack.extend((inp, False) for inp in reversed(inputs))
+                    continue
+            _extract_result_cache[entity] = self._extract_entity(entity)
+        return _extract_result_cache[tileable]
+
+    @staticmethod
+    def _get_arithmetic_template(op: OperandType) -> Optional[str]:
+        if isinstance(op, DataFrameBinopUfunc):
+            if op.fill_value is not None or op.level is not None:
+                return None
+            func_name = getattr(op, "_func_name", None) or getattr(
+                op, "_bit_func_name"
+            )
+        elif isinstance(op, DataFrameUnaryUfunc):
+            func_name = getattr(op, "_func_name") or getattr(op, "_bin_func_name")
         else:
-            result = EvalExtractRecord()
+            return None
+        return _func_name_to_template.get(func_name)
 
-        _extract_result_cache[tileable] = result
-        return result
+    def _get_extract_inputs(self, tileable) -> list:
+        op = tileable.op
+        if self._get_arithmetic_template(op) is None:
+            return []
+        elif isinstance(op, DataFrameBinopUfunc):
+            return [op.lhs, op.rhs]
+        return [op.inputs[0]]
+
+    def _extract_entity(self, tileable) -> EvalExtractRecord:
+        # arithmetic operands are checked first as they are the most common
+        tileable_op = tileable.op
+        template = self._get_arithmetic_template(tileable_op)
+        if template is not None:
+            if isinstance(tileable_op, DataFrameBinopUfunc):
+                return self._extract_binary(tileable, template)
+            return self._extract_unary(tileable, template)
+        elif self._is_select_dataframe_column(tileable):
+            return self._extract_column_select(tileable)
+        return EvalExtractRecord()
 
     @classmethod
     def _extract_column_select(cls, tileable) -> EvalExtractRecord:
         return EvalExtractRecord(tileable.inputs[0], f"`{tileable.op.col_names}`")
 
-    def _extract_unary(self, tileable) -> EvalExtractRecord:
+    def _extract_unary(self, tileable, template: str) -> EvalExtractRecord:
         op = tileable.op
-        func_name = getattr(op, "_func_name") or getattr(op, "_bin_func_name")
-        if func_name not in _func_name_to_builder:  # pragma: no cover
-            return EvalExtractRecord()
-
         in_tileable, expr, variables = self._extract_eval_expression(op.inputs[0])
         if in_tileable is None:
             return EvalExtractRecord()
 
         self._add_collapsable_predecessor(tileable, op.inputs[0])
-        return EvalExtractRecord(
-            in_tileable, _func_name_to_builder[func_name](expr), variables
-        )
+        return EvalExtractRecord(in_tileable, template.format(expr), variables)
 
-    def _extract_binary(self, tileable) -> EvalExtractRecord:
+    def _extract_binary(self, tileable, template: str) -> EvalExtractRecord:
         op = tileable.op
-        func_name = getattr(op, "_func_name", None) or getattr(op, "_bit_func_name")
-        if func_name not in _func_name_to_builder:  # pragma: no cover
-            return EvalExtractRecord()
-
         lhs_tileable, lhs_expr, lhs_vars = self._extract_eval_expression(op.lhs)
         if lhs_tileable is not None:
             self._add_collapsable_predecessor(tileable, op.lhs)
@@ -182,7 +206,7 @@ class SeriesArithmeticToEval(OperandBasedOptimizationRule):
         variables.update(rhs_vars or dict())
         in_tileable = next(t for t in [lhs_tileable, rhs_tileable] if t is not None)
         return EvalExtractRecord(
-            in_tileable, _func_name_to_builder[func_name](lhs_expr, rhs_expr), variables
+            in_tileable, template.format(lhs_expr, rhs_expr), variables
         )
 
     @implements(OperandBasedOptimizationRule.apply_to_operand)
@@ -194,7 +218,7 @@ class SeriesArithmeticToEval(OperandBasedOptimizationRule):
         )
 
         new_op = DataFrameEval(
-            _key=node.op.key,
+            _key=op.key,
             _output_types=get_output_types(node),
             expr=expr,
             variables=variables or dict(),
@@ -224,10 +248,11 @@ class SeriesArithmeticToEval(OperandBasedOptimizationRule):
 class _DataFrameEvalRewriteRule(OperandBasedOptimizationRule):
     @implements(OperandBasedOptimizationRule.match_operand)
     def match_operand(self, op: OperandType) -> bool:
+        if op.gpu:
+            return False
         optimized_eval_op = self._get_optimized_eval_op(op)
         if (
-            op.gpu
-            or not isinstance(optimized_eval_op, DataFrameEval)
+            not isinstance(optimized_eval_op, DataFrameEval)
             or optimized_eval_op.is_query
             or optimized_eval_op.inputs[0].key != op.inputs[0].key
         ):
@@ -330,27 +355,29 @@ class DataFrameEvalSetItemToEval(_DataFrameEvalRewriteRule):
 
         node = op.outputs[0]
         opt_node = self._records.get_optimization_result(node, node)
-        if not isinstance(opt_node.op, DataFrameEval):  # pragma: no cover
+        opt_op = opt_node.op
+        if not isinstance(opt_op, DataFrameEval):  # pragma: no cover
             return
 
         # when encountering consecutive SetItems, expressions can be
         # merged as a multiline expression
         pred_opt_node = opt_node.inputs[0]
+        pred_opt_op = pred_opt_node.op
         if (
-            isinstance(pred_opt_node.op, DataFrameEval)
-            and opt_node.op.parser == pred_opt_node.op.parser == "pandas"
-            and not opt_node.op.is_query
-            and not pred_opt_node.op.is_query
-            and opt_node.op.self_target
-            and pred_opt_node.op.self_target
+            isinstance(pred_opt_op, DataFrameEval)
+            and opt_op.parser == pred_opt_op.parser == "pandas"
+            and not opt_op.is_query
+            and not pred_opt_op.is_query
+            and opt_op.self_target
+            and pred_opt_op.self_target
         ):
-            new_expr = pred_opt_node.op.expr + "\n" + opt_node.op.expr
-            new_variables = (pred_opt_node.op.variables or dict()).copy()
-            new_variables.update(opt_node.op.variables or dict())
+            new_expr = "\n".join([pred_opt_op.expr, opt_op.expr])
+            new_variables = (pred_opt_op.variables or dict()).copy()
+            new_variables.update(opt_op.variables or dict())
 
             new_op = DataFrameEval(
                 _key=op.key,
-                _output_types=get_output_types(op.outputs[0]),
+                _output_types=get_output_types(node),
                 expr=new_expr,
                 variables=new_variables,
                 parser="pandas",
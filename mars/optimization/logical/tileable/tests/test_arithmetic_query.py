@@ -21,7 +21,10 @@ from ..... import dataframe as md
 from ..... import execute, fetch
 from .....core import enter_mode, TileableGraph, TileableGraphBuilder
 from .....dataframe.base.eval import DataFrameEval
+from ...core import OptimizationRecords
 from .. import optimize
+from ..arithmetic_query import SeriesArithmeticToEval
+from ..core import TileableOptimizer
 
 
 _var_pattern = re.compile(r"@__eval_scalar_var\d+")
@@ -91,6 +94,44 @@ def test_arithmetic_query(setup):
     pd.testing.assert_series_equal(r_df2, -raw["A"] + raw["B"] * 5 + 3 * raw["C"])
 
 
+@enter_mode(build=True)
+def test_arithmetic_query_optimize_twice():
+    raw = pd.DataFrame(np.random.rand(100, 10), columns=list("ABCDEFGHIJ"))
+    df1 = md.DataFrame(raw, chunk_size=10)
+    col_a, col_b = df1["A"], df1["B"]
+    neg_a, mul_b = -col_a, col_b * 5
+    df2 = neg_a + mul_b
+    intermediates = [col_a.data, col_b.data, neg_a.data, mul_b.data]
+
+    # extraction results are cached between optimizations,
+    # predecessors shall still be collapsed in later ones
+    for _ in range(2):
+        graph = TileableGraph([df2.data])
+        next(TileableGraphBuilder(graph).build())
+        records = optimize(graph)
+        opt_df2 = records.get_optimization_result(df2.data)
+        assert opt_df2.op.expr == "(-(`A`)) + ((`B`) * (5))"
+        assert len(graph) == 2
+        assert all(n not in graph for n in intermediates)
+
+
+@enter_mode(build=True)
+def test_arithmetic_query_long_chain():
+    raw = pd.DataFrame(np.random.rand(100, 10), columns=list("ABCDEFGHIJ"))
+    df1 = md.DataFrame(raw, chunk_size=10)
+    chain_size = 2000
+    series = df1["A"]
+    for _ in range(chain_size):
+        series = series + 1
+
+    # chains longer than recursion limit shall be extracted
+    graph = TileableGraph([series.data])
+    rule = SeriesArithmeticToEval(graph, OptimizationRecords(), TileableOptimizer)
+    in_tileable, expr, _ = rule._extract_eval_expression(series.data)
+    assert in_tileable.key == df1.key
+    assert expr == "(" * chain_size + "`A`" + ") + (1)" * chain_size
+
+
 @enter_mode(build=True)
 def test_bool_eval_to_query(setup):
     raw = pd.DataFrame(np.random.rand(100, 10), columns=list("ABCDEFGHIJ"))